@@ -3,30 +3,65 @@
 
 Этап 1: минимальный CLI с конфигурацией (печать параметров по --conf-dump).
 Этап 2: сбор прямых зависимостей для пакета (Cargo) по API crates.io.
-Этап 3: построение полного графа (DFS, рекурсия), игнор по подстроке, обработка циклов,
+Этап 3: построение полного графа (BFS с параллельной загрузкой; DFS в тестовом режиме),
+        игнор по подстроке, обработка циклов,
         режим тестового репозитория (локальный файл с описанием графа БОЛЬШИМИ ЛАТИНСКИМИ БУКВАМИ).
 Этап 4: дополнительные операции — обратные зависимости (--reverse) для тестового репозитория.
 Этап 5: визуализация — ASCII-дерево (по умолчанию) или вывод Graphviz DOT (--output dot).
+        --condense сжимает циклы (SCC) в узлы {A,B,...}, чтобы выводился DAG.
 
 """
 
 from __future__ import annotations
 
 import argparse
+import functools
+import http.client
 import json
+import mmap
 import os
 import re
+import sqlite3
+import string
 import sys
-from collections import defaultdict, deque
-from typing import Dict, List, Set, Tuple
-from urllib.request import urlopen, Request
+import threading
+import time
+import zlib
+from array import array
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, NamedTuple, Set, Tuple
 from urllib.error import URLError, HTTPError
-from urllib.parse import urlparse
+from urllib.parse import urljoin, urlparse
+from urllib.request import Request, getproxies, proxy_bypass, urlopen
+
+try:  # необязательно: orjson быстрее и сам принимает bytes
+    import orjson
+    _json_loads = orjson.loads
+    _JSON_ERRORS: Tuple[type, ...] = (json.JSONDecodeError, orjson.JSONDecodeError, UnicodeDecodeError)
+except ImportError:
+    _json_loads = json.loads
+    _JSON_ERRORS = (json.JSONDecodeError, UnicodeDecodeError)
+
+np = None  # numpy/numba необязательны и импортируются лениво, см. _bfs_csr_jit()
 
 # ------------------------- ЭТАП 1: CLI + валидации -------------------------
 
-PKG_RE = re.compile(r"^[a-z0-9]+([_-][a-z0-9]+)*$")  # имя crate на crates.io
-UPPER_RE = re.compile(r"^[A-Z]+$")                   # имя узла в тестовом репо
+# Имена проверяются строковыми методами (C-уровень) вместо маленьких регэкспов.
+_PKG_CHARS = frozenset(string.ascii_lowercase + string.digits + "_-")
+_PKG_SEPS = ("--", "__", "-_", "_-")
+
+def is_crate_name(s: str) -> bool:
+    """Имя crate на crates.io: [a-z0-9]+ с одиночными '-'/'_' внутри."""
+    return (bool(s) and _PKG_CHARS.issuperset(s)
+            and s[0] not in "-_" and s[-1] not in "-_"
+            and not any(sep in s for sep in _PKG_SEPS))
+
+def is_upper_name(s: str) -> bool:
+    """Имя узла в тестовом репо: только A..Z."""
+    return s.isascii() and s.isalpha() and s.isupper()
+
+LINE_RE = re.compile(rb"([A-Z]+)\s*:\s*((?:[A-Z]+(?:\s+[A-Z]+)*)?)")  # строка "X: Y Z" целиком (bytes)
 
 def is_url(s: str) -> bool:
     try:
@@ -53,6 +88,12 @@ def parse_args() -> argparse.Namespace:
                    help="(Этап 1) вывести параметры ключ=значение и выйти")
     p.add_argument("--reverse", action="store_true",
                    help="(Этап 4) вывести ОБРАТНЫЕ зависимости (только в --test-mode)")
+    p.add_argument("--condense", action="store_true",
+                   help="сжать циклы (компоненты сильной связности) в узлы {A,B,...} перед выводом")
+    p.add_argument("--no-cache", action="store_true",
+                   help="не использовать дисковый кэш ответов crates.io")
+    p.add_argument("--cache-ttl", type=int, default=24 * 3600,
+                   help="время жизни записи кэша в секундах (0 — без ограничения)")
     return p.parse_args()
 
 def validate_stage1(ns: argparse.Namespace) -> Dict[str, str]:
@@ -68,13 +109,15 @@ def validate_stage1(ns: argparse.Namespace) -> Dict[str, str]:
         # crates.io 
         if not ns.package:
             fail("--package is required in crates.io mode")
-        if not PKG_RE.match(ns.package):
+        if not is_crate_name(ns.package):
             fail("invalid crate name: use lowercase letters, digits, '-' or '_'")
         if ns.repo and not is_url(ns.repo):
             fail("--repo should be an HTTP/HTTPS URL (or omit) in crates.io mode")
 
     if ns.output not in ("ascii-tree", "dot"):
         fail("unsupported --output (allowed: ascii-tree, dot)")
+    if ns.cache_ttl < 0:
+        fail("--cache-ttl must be >= 0")
 
     cfg = {
         "package": ns.package or "",
@@ -83,6 +126,9 @@ def validate_stage1(ns: argparse.Namespace) -> Dict[str, str]:
         "output": ns.output,
         "filter": ns.filter or "",
         "reverse": "true" if ns.reverse else "false",
+        "condense": "true" if ns.condense else "false",
+        "cache": "false" if ns.no_cache else "true",
+        "cache_ttl": str(ns.cache_ttl),
     }
     return cfg
 
@@ -90,18 +136,136 @@ def validate_stage1(ns: argparse.Namespace) -> Dict[str, str]:
 
 CRATES_API = "https://crates.io/api/v1/crates"
 
+# --- дисковый кэш ответов (sqlite, тело сжато zlib) ---
+
+CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "edu-deps-tool.sqlite")
+
+_cache_db: "sqlite3.Connection | None" = None
+_cache_ttl = 0
+_cache_lock = threading.Lock()
+
+def open_cache(path: str, ttl: int) -> None:
+    """Подключает кэш; при ошибке (нет прав и т.п.) работаем без него."""
+    global _cache_db, _cache_ttl
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        db = sqlite3.connect(path, check_same_thread=False)
+        db.execute("CREATE TABLE IF NOT EXISTS cache(url TEXT PRIMARY KEY, body BLOB, ts INTEGER)")
+        db.commit()
+    except (OSError, sqlite3.Error) as e:
+        print(f"[debug] cache disabled: {e}", file=sys.stderr)
+        return
+    _cache_db, _cache_ttl = db, ttl
+
+def _cache_disable(e: sqlite3.Error) -> None:
+    """Ошибка БД посреди работы (locked, диск полон...) — дальше работаем без кэша."""
+    global _cache_db
+    if _cache_db is not None:
+        print(f"[debug] cache disabled: {e}", file=sys.stderr)
+        _cache_db = None
+
+def _cache_get(url: str) -> "bytes | None":
+    with _cache_lock:
+        if _cache_db is None:
+            return None
+        try:
+            row = _cache_db.execute("SELECT body, ts FROM cache WHERE url = ?", (url,)).fetchone()
+        except sqlite3.Error as e:
+            _cache_disable(e)
+            return None
+    if row is None or (_cache_ttl and time.time() - row[1] > _cache_ttl):
+        return None
+    try:
+        return zlib.decompress(row[0])
+    except zlib.error:
+        return None
+
+def _cache_put(url: str, data: bytes) -> None:
+    with _cache_lock:
+        if _cache_db is None:
+            return
+        try:
+            _cache_db.execute("INSERT OR REPLACE INTO cache(url, body, ts) VALUES (?, ?, ?)",
+                              (url, zlib.compress(data), int(time.time())))
+            _cache_db.commit()
+        except sqlite3.Error as e:
+            _cache_disable(e)
+
+# --- HTTP с keep-alive: одно соединение на хост в каждом потоке пула ---
+
+HTTP_HEADERS = {"User-Agent": "edu-deps-tool/1.0", "Accept": "application/json"}
+HTTP_TIMEOUT = 20
+_REDIRECTS = (301, 302, 303, 307, 308)
+
+_local = threading.local()
+
+def _connection(scheme: str, netloc: str) -> http.client.HTTPConnection:
+    conns = getattr(_local, "conns", None)
+    if conns is None:
+        conns = _local.conns = {}
+    conn = conns.get((scheme, netloc))
+    if conn is None:
+        cls = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+        conn = conns[(scheme, netloc)] = cls(netloc, timeout=HTTP_TIMEOUT)
+    return conn
+
+# разрыв простаивающего keep-alive соединения сервером — имеет смысл переподключиться;
+# таймауты, DNS и прочее повторять не нужно
+_STALE_CONN_ERRORS = (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError)
+
+@functools.lru_cache(maxsize=None)
+def _uses_proxy(scheme: str, host: str) -> bool:
+    """Учитываем HTTP(S)_PROXY / no_proxy, как это делал urlopen."""
+    return scheme in getproxies() and not proxy_bypass(host)
+
+def _urlopen_get(url: str) -> bytes:
+    """Запрос через urllib (прокси, его авторизация и редиректы — на стороне urllib)."""
+    with urlopen(Request(url, headers=HTTP_HEADERS), timeout=HTTP_TIMEOUT) as r:
+        return r.read()
+
+def http_get(url: str, _redirects: int = 5) -> bytes:
+    """GET по переиспользуемому соединению (без новых TCP+TLS рукопожатий на каждый запрос)."""
+    p = urlparse(url)
+    if _uses_proxy(p.scheme, p.netloc):
+        return _urlopen_get(url)
+    conn = _connection(p.scheme, p.netloc)
+    path = (p.path or "/") + (f"?{p.query}" if p.query else "")
+    for attempt in range(2):
+        try:
+            conn.request("GET", path, headers=HTTP_HEADERS)
+            resp = conn.getresponse()
+            data = resp.read()
+            break
+        except _STALE_CONN_ERRORS as e:
+            conn.close()
+            if attempt:
+                raise URLError(e)
+        except (http.client.HTTPException, OSError) as e:
+            conn.close()
+            raise URLError(e)
+    if resp.status in _REDIRECTS and _redirects and resp.getheader("Location"):
+        return http_get(urljoin(url, resp.getheader("Location")), _redirects - 1)
+    if resp.status >= 300:
+        raise HTTPError(url, resp.status, resp.reason, resp.headers, None)
+    return data
+
+@functools.lru_cache(maxsize=None)
 def http_get_json(url: str) -> dict:
+    data = _cache_get(url)
     try:
-        print("[debug] GET", url)
-        req = Request(url, headers={"User-Agent": "edu-deps-tool/1.0"})
-        with urlopen(req, timeout=20) as r:
-            data = r.read()
-        return json.loads(data.decode("utf-8"))
+        if data is None:
+            print("[debug] GET", url)
+            data = http_get(url)
+            result = _json_loads(data)
+            _cache_put(url, data)
+            return result
+        return _json_loads(data)
     except (HTTPError, URLError) as e:
         fail(f"cannot GET {url}: {e}")
-    except json.JSONDecodeError as e:
+    except _JSON_ERRORS as e:
         fail(f"invalid JSON from {url}: {e}")
 
+@functools.lru_cache(maxsize=None)
 def crates_latest_version(crate: str) -> str:
     meta = http_get_json(f"{CRATES_API}/{crate}")
     newest = meta.get("crate", {}).get("newest_version")
@@ -112,7 +276,12 @@ def crates_latest_version(crate: str) -> str:
         newest = versions[0].get("num")
     return newest
 
+_deps_cache: Dict[Tuple[str, str], List[Tuple[str, str, str]]] = {}
+
 def crates_direct_deps(crate: str, version: str) -> List[Tuple[str, str, str]]:
+    cached = _deps_cache.get((crate, version))
+    if cached is not None:
+        return cached
     url = f"{CRATES_API}/{crate}/{version}/dependencies"
     j = http_get_json(url)
     deps = []
@@ -125,144 +294,415 @@ def crates_direct_deps(crate: str, version: str) -> List[Tuple[str, str, str]]:
         crate_id = d.get("crate_id")
         req = d.get("req") or ""
         deps.append((crate_id, req, kind))
+    _deps_cache[(crate, version)] = deps
     return deps
 
 # ---------------------- ЭТАП 3: полный граф ----------------------
 
 Graph = Dict[str, Set[str]]
 
+def _false(n: str) -> bool:
+    return False
+
+def make_skip(flt: str) -> Callable[[str], bool]:
+    """
+    Предикат «игнорировать узел»: результат lower()+поиска считается один раз на имя.
+    Без --filter (обычный случай) — общий _false без lower() и словаря.
+    """
+    flt_low = (flt or "").lower()
+    if not flt_low:
+        return _false
+    blocked: Dict[str, bool] = {}
+
+    def skip(n: str) -> bool:
+        r = blocked.get(n)
+        if r is None:
+            r = blocked[n] = flt_low in n.lower()
+        return r
+    return skip
+
+FETCH_WORKERS = 16  # параллельных запросов к crates.io
+
+def _fetch_node(node: str) -> Tuple[str, List[Tuple[str, str, str]]]:
+    """Последняя версия + прямые зависимости узла (выполняется в пуле потоков)."""
+    try:
+        ver = crates_latest_version(node)
+        return node, crates_direct_deps(node, ver)
+    except Exception:
+        return node, []
+
 def build_graph_cratesio(root: str, flt: str) -> Graph:
+    """BFS по уровням: весь фронт текущего уровня запрашивается параллельно."""
     graph: Graph = defaultdict(set)
     visited: Set[str] = set()
 
-    flt_low = (flt or "").lower()
-
-    def dfs(node: str):
-        if flt_low and flt_low in node.lower():
-            return
-        if node in visited:
-            return
-        visited.add(node)
-        try:
-            ver = crates_latest_version(node)
-            deps = crates_direct_deps(node, ver)
-        except Exception:
-            return
-        for dep, _req, _kind in deps:
-            if flt_low and flt_low in dep.lower():
-                continue
-            graph[node].add(dep)
-            if dep in visited:
-                continue
-            dfs(dep)
-    dfs(root)
+    skip = make_skip(flt)
+
+    frontier: List[str] = [] if skip(root) else [root]
+    with ThreadPoolExecutor(max_workers=FETCH_WORKERS) as pool:
+        while frontier:
+            visited.update(frontier)
+            nxt: List[str] = []
+            # граф и visited меняются только здесь, в главном потоке
+            for node, deps in pool.map(_fetch_node, frontier):
+                for dep, _req, _kind in deps:
+                    if skip(dep):
+                        continue
+                    graph[node].add(dep)
+                    if dep not in visited:
+                        visited.add(dep)
+                        nxt.append(dep)
+            frontier = nxt
     return graph
 
 # --- тестовый репозиторий ---
 
-def load_test_graph(path: str) -> Graph:
+class CSRGraph(NamedTuple):
+    """Компактный граф (CSR): узлы — целые id, соседи u — indices[indptr[u]:indptr[u + 1]]."""
+    names: List[str]         # id -> имя
+    ids: Dict[str, int]      # имя -> id
+    indptr: array            # array('i'), длина n + 1
+    indices: array           # array('i'), длина |E|
+
+def parse_test_line_slow(raw: bytes) -> List[Tuple[str, List[str]]]:
+    """
+    Медленный путь для строк, не прошедших LINE_RE: прежний разбор через str
+    (Unicode-пробелы, одиночные \r как перевод строки) с точными сообщениями об ошибке.
+    """
+    text = raw.decode("utf-8", "replace").replace("\r\n", "\n").replace("\r", "\n")
+    out: List[Tuple[str, List[str]]] = []
+    for line in text.split("\n"):
+        s = line.strip()
+        if not s or s.startswith("#"):
+            continue
+        if ":" not in s:
+            fail(f"bad test graph line (expected 'X: Y Z'): {s}")
+        left, right = s.split(":", 1)
+        left = left.strip()
+        if not is_upper_name(left):
+            fail(f"invalid node name in test graph (must be A..Z+): {left}")
+        deps = right.split()
+        for d in deps:
+            if not is_upper_name(d):
+                fail(f"invalid dep name in test graph (must be A..Z+): {d}")
+        out.append((left, deps))
+    return out
+
+def load_test_graph(path: str) -> CSRGraph:
     """
     Формат файла: по одной зависимости на строку, двоеточие и пробелы:
       A: B C
       B: C
       C:
     """
-    g: Graph = defaultdict(set)
-    with open(path, encoding="utf-8") as f:
-        for line in f:
-            s = line.strip()
-            if not s or s.startswith("#"):
-                continue
-            if ":" not in s:
-                fail(f"bad test graph line (expected 'X: Y Z'): {s}")
-            left, right = s.split(":", 1)
-            left = left.strip()
-            if not UPPER_RE.fullmatch(left):
-                fail(f"invalid node name in test graph (must be A..Z+): {left}")
-            deps = [t for t in right.strip().split() if t]
-            for d in deps:
-                if not UPPER_RE.fullmatch(d):
-                    fail(f"invalid dep name in test graph (must be A..Z+): {d}")
-                g[left].add(d)
-            g.setdefault(left, set())  # гарантируем наличие узла
-    return g
-
-def dfs_prune_by_filter(g: Graph, start: str, flt: str) -> Graph:
+    # разбор идёт по байтам (mmap, без str на каждую строку); имена декодируются
+    # один раз на уникальный узел в самом конце
+    raw_names: List[bytes] = []
+    raw_ids: Dict[bytes, int] = {}
+    adj: List[Set[int]] = []
+
+    def intern(name: bytes) -> int:
+        i = raw_ids.get(name)
+        if i is None:
+            i = raw_ids[name] = len(raw_names)
+            raw_names.append(name)
+            adj.append(set())
+        return i
+
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size:  # mmap не умеет пустые файлы
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                for line in iter(mm.readline, b""):
+                    s = line.strip()
+                    if not s or s.startswith(b"#"):
+                        continue
+                    m = None if b"\r" in s else LINE_RE.fullmatch(s)
+                    if m is None:
+                        for left, deps in parse_test_line_slow(s):
+                            u = intern(left.encode("ascii"))
+                            for d in deps:
+                                adj[u].add(intern(d.encode("ascii")))
+                        continue
+                    u = intern(m.group(1))  # гарантируем наличие узла
+                    # группа 2 уже состоит только из [A-Z]+ через пробелы — повторно не проверяем
+                    for d in m.group(2).split():
+                        adj[u].add(intern(d))
+
+    names = [n.decode("ascii") for n in raw_names]
+    ids = {n: i for i, n in enumerate(names)}
+    indptr = array("i", [0])
+    indices = array("i")
+    for nbrs in adj:
+        indices.extend(sorted(nbrs))
+        indptr.append(len(indices))
+    return CSRGraph(names, ids, indptr, indices)
+
+def graph_to_csr(g: Graph) -> CSRGraph:
+    """Словарь множеств -> CSR (узлы — ключи и все цели рёбер)."""
+    names: List[str] = list(g)
+    ids: Dict[str, int] = {n: i for i, n in enumerate(names)}
+    for nbrs in g.values():
+        for v in nbrs:
+            if v not in ids:
+                ids[v] = len(names)
+                names.append(v)
+    indptr = array("i", [0])
+    indices = array("i")
+    for n in names:
+        indices.extend(sorted(ids[v] for v in g.get(n, ())))
+        indptr.append(len(indices))
+    return CSRGraph(names, ids, indptr, indices)
+
+def dfs_prune_by_filter(g: CSRGraph, start: str, flt: str) -> Graph:
     """Обходит граф DFS с учетом игнора по подстроке; возвращает подграф достижимых узлов."""
-    flt_low = (flt or "").lower()
+    skip = make_skip(flt)
     out: Graph = defaultdict(set)
-    visited: Set[str] = set()
-
-    def dfs(u: str):
-        if u in visited:
-            return
-        if flt_low and flt_low in u.lower():
-            return
-        visited.add(u)
-        for v in g.get(u, ()):
-            if flt_low and flt_low in v.lower():
+    names, indptr, indices = g.names, g.indptr, g.indices
+    visited = bytearray(len(names))
+
+    # соседи проверяются фильтром до попадания в стек, поэтому отдельно — только start
+    root = g.ids.get(start)
+    stack: List[int] = [] if root is None or skip(start) else [root]
+    while stack:
+        u = stack.pop()
+        if visited[u]:
+            continue
+        visited[u] = 1
+        for v in indices[indptr[u]:indptr[u + 1]]:
+            name = names[v]
+            if skip(name):
                 continue
-            out[u].add(v)
-            dfs(v)
-
-    dfs(start)
+            out[names[u]].add(name)
+            if not visited[v]:
+                stack.append(v)
     return out
 
-def reverse_graph(g: Graph) -> Graph:
-    r: Graph = defaultdict(set)
-    for u, nbrs in g.items():
-        for v in nbrs:
-            r[v].add(u)
-        r.setdefault(u, set())
-    return r
+def reverse_graph(g: CSRGraph) -> CSRGraph:
+    """Транспонирование CSR подсчётом степеней (без промежуточных множеств)."""
+    n = len(g.names)
+    indptr, indices = g.indptr, g.indices
+    counts = [0] * (n + 1)
+    for v in indices:
+        counts[v + 1] += 1
+    for i in range(n):
+        counts[i + 1] += counts[i]
+    r_indptr = array("i", counts)
+    r_indices = array("i", bytes(4 * len(indices)))
+    pos = counts[:n]
+    for u in range(n):
+        for v in indices[indptr[u]:indptr[u + 1]]:
+            r_indices[pos[v]] = u
+            pos[v] += 1
+    return CSRGraph(g.names, g.ids, r_indptr, r_indices)
+
+def _bfs_csr_py(indptr, indices, start: int, n: int) -> bytearray:
+    seen = bytearray(n)
+    queue = [start]
+    head = 0
+    while head < len(queue):
+        u = queue[head]
+        head += 1
+        for v in indices[indptr[u]:indptr[u + 1]]:
+            if not seen[v]:
+                seen[v] = 1
+                queue.append(v)
+    return seen
 
-def reachable(g: Graph, start: str) -> Set[str]:
-    """Все узлы, из которых достижим start в rG (или в G — в зависимости от вызова)."""
-    seen: Set[str] = set()
-    dq = deque([start])
-    while dq:
-        u = dq.popleft()
-        for v in g.get(u, ()):
-            if v not in seen:
-                seen.add(v)
-                dq.append(v)
+def _bfs_csr_kernel(indptr, indices, start, n):
+    seen = np.zeros(n, np.uint8)
+    queue = np.empty(n + 1, np.int32)  # каждый узел попадает в очередь не более раза (+ start)
+    queue[0] = start
+    head, tail = 0, 1
+    while head < tail:
+        u = queue[head]
+        head += 1
+        for i in range(indptr[u], indptr[u + 1]):
+            v = indices[i]
+            if not seen[v]:
+                seen[v] = 1
+                queue[tail] = v
+                tail += 1
     return seen
 
-# ---------------------- ЭТАП 5: визуализации (ASCII / DOT) ----------------------
+@functools.lru_cache(maxsize=None)
+def _bfs_csr_jit():
+    """numba-версия BFS или None. Импорт numba долгий, поэтому только по первому запросу."""
+    global np
+    try:
+        import numpy
+        from numba import njit
+    except ImportError:
+        return None
+    np = numpy
+    return njit(cache=True)(_bfs_csr_kernel)
+
+JIT_MIN_EDGES = 100_000  # на графах меньше импорт numba дороже самого обхода
+
+def _reached_ids(g: CSRGraph, s: int) -> List[int]:
+    """id узлов, достижимых из s по непустому пути (s — только через цикл)."""
+    n = len(g.names)
+    bfs = _bfs_csr_jit() if len(g.indices) >= JIT_MIN_EDGES else None
+    if bfs is None:
+        seen = _bfs_csr_py(g.indptr, g.indices, s, n)
+        return [i for i, f in enumerate(seen) if f]
+    seen = bfs(np.frombuffer(g.indptr, dtype=np.intc),
+               np.frombuffer(g.indices, dtype=np.intc), s, n)
+    return np.flatnonzero(seen).tolist()
+
+def reachable(g: CSRGraph, start: str) -> Set[str]:
+    """Все узлы, из которых достижим start в rG (или в G — в зависимости от вызова)."""
+    s = g.ids.get(start)
+    if s is None:
+        return set()
+    names = g.names
+    return {names[i] for i in _reached_ids(g, s)}
 
-def print_ascii_tree(g: Graph, root: str) -> None:
-    visited: Set[str] = set()
+def compute_reverse_subgraph(g: CSRGraph, target: str) -> Tuple[Graph, Set[str]]:
+    """
+    Обратные зависимости target: один BFS по rG от target (JIT, если доступен),
+    затем подграф rG из рёбер target и найденных узлов — без второго обхода.
+    Возвращает подграф и множество узлов, зависящих от target.
+    """
+    s = g.ids.get(target)
+    if s is None:
+        return {}, set()
+    r = reverse_graph(g)
+    names, indptr, indices = r.names, r.indptr, r.indices
+    dependents = _reached_ids(r, s)
+    out: Graph = {}
+    for u in [s] + dependents:
+        out[names[u]] = {names[v] for v in indices[indptr[u]:indptr[u + 1]]}
+    return out, {names[i] for i in dependents}
+
+def strong_components(g: CSRGraph) -> Tuple[List[int], int]:
+    """
+    Итеративный Тарьян: метка SCC для каждого узла и число компонент.
+    Метки выдаются в обратном топологическом порядке (0 — сток конденсации).
+    """
+    n = len(g.names)
+    indptr, indices = g.indptr, g.indices
+    index = [-1] * n
+    low = [0] * n
+    on_stack = bytearray(n)
+    stack: List[int] = []
+    labels = [-1] * n
+    counter = comp = 0
+    for s in range(n):
+        if index[s] != -1:
+            continue
+        index[s] = low[s] = counter
+        counter += 1
+        stack.append(s)
+        on_stack[s] = 1
+        work = [(s, indptr[s])]
+        while work:
+            u, i = work[-1]
+            if i < indptr[u + 1]:
+                work[-1] = (u, i + 1)
+                v = indices[i]
+                if index[v] == -1:
+                    index[v] = low[v] = counter
+                    counter += 1
+                    stack.append(v)
+                    on_stack[v] = 1
+                    work.append((v, indptr[v]))
+                elif on_stack[v] and index[v] < low[u]:
+                    low[u] = index[v]
+                continue
+            work.pop()
+            if work:
+                p = work[-1][0]
+                if low[u] < low[p]:
+                    low[p] = low[u]
+            if low[u] == index[u]:
+                while True:
+                    w = stack.pop()
+                    on_stack[w] = 0
+                    labels[w] = comp
+                    if w == u:
+                        break
+                comp += 1
+    return labels, comp
 
-    def rec(u: str, prefix: str, is_last: bool):
-        connector = "└─ " if is_last else "├─ "
-        print(prefix + connector + u)
-        visited.add(u)
-        children = sorted(list(g.get(u, [])))
-        if not children:
-            return
-        new_pref = prefix + ("   " if is_last else "│  ")
-        for i, v in enumerate(children):
-            if v in visited:
-                print(new_pref + ("└─ " if i == len(children) - 1 else "├─ ") + v + " (cycle/seen)")
-            else:
-                rec(v, new_pref, i == len(children) - 1)
+# ---------------------- ЭТАП 5: визуализации (ASCII / DOT) ----------------------
 
+def condense_graph(g: Graph, root: str) -> Tuple[Graph, str]:
+    """
+    Сжимает каждую SCC в один узел "{A,B,C}" (петля A -> A даёт "{A}"), так что
+    на выходе DAG: каждый цикл выводится один раз вместо повторов с (cycle/seen).
+    Возвращает граф конденсации и имя узла, в который попал root.
+    """
+    csr = graph_to_csr(g)
+    labels, k = strong_components(csr)
+    names, indptr, indices = csr.names, csr.indptr, csr.indices
+    members: List[List[str]] = [[] for _ in range(k)]
+    cyclic = bytearray(k)
+    for u, c in enumerate(labels):
+        members[c].append(names[u])
+        if u in indices[indptr[u]:indptr[u + 1]]:
+            cyclic[c] = 1
+    comp_name = [f"{{{','.join(sorted(m))}}}" if len(m) > 1 or cyclic[c] else m[0]
+                 for c, m in enumerate(members)]
+    out: Graph = {}
+    for u, n in enumerate(names):
+        c = labels[u]
+        if n in g:  # ключ в исходном графе — ключ и в сжатом (важно для emitters)
+            out.setdefault(comp_name[c], set())
+        for v in indices[indptr[u]:indptr[u + 1]]:
+            d = labels[v]
+            if d != c:
+                out.setdefault(comp_name[c], set()).add(comp_name[d])
+    r = csr.ids.get(root)
+    return out, (root if r is None else comp_name[labels[r]])
+
+FLUSH_CHARS = 1 << 20  # размер пачки вывода: мало вызовов write, но без всего вывода в памяти
+
+def print_ascii_tree(g: Graph, root: str) -> None:
     if root not in g:
         print(root)
         return
-    rec(root, "", True)
+    visited: Set[str] = set()
+    out: List[str] = []
+    pending = 0
+    write, vis_add = out.append, visited.add
+    # (узел, начало строки «префикс + коннектор», префикс для детей); «уже виден»
+    # проверяется при снятии со стека — к этому моменту поддеревья предыдущих
+    # братьев уже выведены. Раскрывается каждый узел один раз, так что sorted()
+    # на узел тоже один; строки-префиксы собираются один раз на родителя.
+    stack: List[Tuple[str, str, str]] = [(root, "└─ ", "   ")]
+    push = stack.append
+    while stack:
+        u, head, pref = stack.pop()
+        seen = u in visited
+        line = f"{head}{u} (cycle/seen)\n" if seen else f"{head}{u}\n"
+        write(line)
+        pending += len(line)
+        if pending >= FLUSH_CHARS:
+            sys.stdout.write("".join(out))
+            out.clear()
+            pending = 0
+        if seen:
+            continue
+        vis_add(u)
+        nbrs = g.get(u)
+        if not nbrs:
+            continue
+        children = sorted(nbrs)
+        push((children[-1], pref + "└─ ", pref + "   "))
+        mid = (pref + "├─ ", pref + "│  ")
+        for i in range(len(children) - 2, -1, -1):
+            push((children[i], *mid))
+    sys.stdout.write("".join(out))
 
 def to_dot(g: Graph) -> str:
-    lines = ["digraph deps {"]
-    lines.append('  rankdir=LR; node [shape=box, fontsize=10];')
-    nodes = set(g.keys())
+    lines = ["digraph deps {", '  rankdir=LR; node [shape=box, fontsize=10];']
+    extend = lines.extend
     for u, nbrs in g.items():
-        nodes.update(nbrs)
-        for v in nbrs:
-            lines.append(f'  "{u}" -> "{v}";')
-    for n in nodes:
-        if n not in g and not any(n in s for s in g.values()):
-            lines.append(f'  "{n}";')
+        head = f'  "{u}" -> "'  # начало строки — один раз на узел, не на ребро
+        extend([head + v + '";' for v in nbrs])
+    # узлы без единого ребра: множество целей считается один раз, O(V + E)
+    targets: Set[str] = set().union(*g.values())
+    extend([f'  "{n}";' for n in g.keys() - targets if not g[n]])
     lines.append("}")
     return "\n".join(lines)
 
@@ -281,38 +721,42 @@ def main() -> int:
     if ns.test_mode:
         # ЭТАП 3:
         full_g = load_test_graph(ns.repo)
-        if not ns.package or not UPPER_RE.fullmatch(ns.package):
+        if not ns.package or not is_upper_name(ns.package):
             fail("--package must be provided as UPPER-CASE name in --test-mode (e.g., A)")
-        sub = dfs_prune_by_filter(full_g, ns.package, ns.filter)
 
         if ns.reverse:
             # ЭТАП 4:
-            r = reverse_graph(full_g)
-            depends_on_me = reachable(r, ns.package)
-            g_rev: Graph = defaultdict(set)
-            for v in depends_on_me:
-                for u in r.get(v, ()):
-                    if u in depends_on_me or u == ns.package:
-                        g_rev[v].add(u)
+            g_rev, _depends_on_me = compute_reverse_subgraph(full_g, ns.package)
+            root = ns.package
+            if ns.condense:
+                g_rev, root = condense_graph(g_rev, root)
             # Визуализация
             if ns.output == "ascii-tree":
                 print(f"Reverse dependencies of {ns.package}:")
-                print_ascii_tree(r, ns.package)
+                print_ascii_tree(g_rev, root)
             else:
                 print(to_dot(g_rev))
             return 0
 
         # Обычный вывод графа
+        sub = dfs_prune_by_filter(full_g, ns.package, ns.filter)
+        root = ns.package
+        if ns.condense:
+            sub, root = condense_graph(sub, root)
         if ns.output == "ascii-tree":
-            print_ascii_tree(sub, ns.package)
+            print_ascii_tree(sub, root)
         else:
             print(to_dot(sub))
         return 0
 
     # Режим crates.io (ЭТАП 2 + ЭТАП 3 + ЭТАП 5)
     root = ns.package
+    if not ns.no_cache:
+        open_cache(CACHE_PATH, ns.cache_ttl)
     # строим транзитивный граф с фильтром, DFS, обработкой циклов
     g = build_graph_cratesio(root, ns.filter)
+    if ns.condense:
+        g, root = condense_graph(g, root)
 
     if ns.output == "ascii-tree":
         print_ascii_tree(g, root)